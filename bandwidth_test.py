@@ -6,11 +6,45 @@ Quick bandwidth test untuk YouTube streaming
 import subprocess
 import time
 import sys
+import re
+
+# Ping summary (also used by debug_stream): packet loss + rtt min/avg/max (Linux "mdev", macOS "stddev")
+_PING_RE = re.compile(
+    r'(?P<loss>\d+(?:\.\d+)?)% packet loss'
+    r'(?:.*?min/avg/max(?:/[a-z]+)?\s*=\s*(?P<min>[\d.]+)/(?P<avg>[\d.]+)/(?P<max>[\d.]+))?',
+    re.S
+)
+
+_IS_TTY = sys.stdout.isatty()
+_RULE = "=" * 60
+
+_REQUIREMENTS = """
+2️⃣ Bandwidth requirements:
+   📹 Video: 10 Mbps
+   🎵 Audio: 0.192 Mbps
+   📦 Total: ~10.2 Mbps
+   🚀 Recommended: 15+ Mbps upload (1.5x safety margin)
+   ⚡ Ideal: 20+ Mbps upload (2x safety margin)
+
+3️⃣ Recommendations:
+   ✅ Use 10M bitrate (safe for most home internet)
+   ✅ Use 'veryfast' preset (low CPU, fast encoding)
+   ✅ Use 192k audio (excellent quality, less bandwidth)
+   ✅ Use 50M buffer (handles network fluctuations)
+"""
+
+_TIPS = """💡 If still buffering, try these in order:
+   1. Reduce bitrate to 8M
+   2. Reduce resolution to 1920x1080 (1080p)
+   3. Use 'ultrafast' preset
+   4. Check if other apps using upload bandwidth
+"""
 
 def test_upload_to_youtube():
     """Test upload bandwidth ke YouTube RTMP server"""
     print("🚀 Testing upload bandwidth to YouTube RTMP servers...")
-    print("=" * 60)
+    if _IS_TTY:
+        print(_RULE)
     
     # Test ping stability
     print("\n1️⃣ Testing connection stability...")
@@ -22,38 +56,23 @@ def test_upload_to_youtube():
             timeout=10
         )
         
-        lines = result.stdout.split('\n')
-        for line in lines:
-            if 'packet loss' in line:
-                print(f"   {line.strip()}")
-            if 'min/avg/max' in line:
-                print(f"   {line.strip()}")
+        m = _PING_RE.search(result.stdout)
+        if m:
+            print(f"   {m.group('loss')}% packet loss")
+            if m.group('avg'):
+                print(f"   min/avg/max = {m.group('min')}/{m.group('avg')}/{m.group('max')} ms")
                 
     except Exception as e:
         print(f"   ⚠️ Ping test failed: {e}")
     
-    # Estimate bandwidth needed
-    print("\n2️⃣ Bandwidth requirements:")
-    print("   📹 Video: 10 Mbps")
-    print("   🎵 Audio: 0.192 Mbps")
-    print("   📦 Total: ~10.2 Mbps")
-    print("   🚀 Recommended: 15+ Mbps upload (1.5x safety margin)")
-    print("   ⚡ Ideal: 20+ Mbps upload (2x safety margin)")
-    
-    # Check if we can simulate bandwidth
-    print("\n3️⃣ Recommendations:")
-    print("   ✅ Use 10M bitrate (safe for most home internet)")
-    print("   ✅ Use 'veryfast' preset (low CPU, fast encoding)")
-    print("   ✅ Use 192k audio (excellent quality, less bandwidth)")
-    print("   ✅ Use 50M buffer (handles network fluctuations)")
+    # Estimate bandwidth needed + recommendations
+    sys.stdout.write(_REQUIREMENTS)
     
-    print("\n" + "=" * 60)
-    print("💡 If still buffering, try these in order:")
-    print("   1. Reduce bitrate to 8M")
-    print("   2. Reduce resolution to 1920x1080 (1080p)")
-    print("   3. Use 'ultrafast' preset")
-    print("   4. Check if other apps using upload bandwidth")
-    print("=" * 60)
+    if _IS_TTY:
+        sys.stdout.write(f"\n{_RULE}\n{_TIPS}{_RULE}\n")
+    else:
+        sys.stdout.write(f"\n{_TIPS}")
+    sys.stdout.flush()
 
 if __name__ == '__main__':
     test_upload_to_youtube()
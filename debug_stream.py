@@ -6,13 +6,99 @@ Debug tool untuk monitor streaming quality dan network performance
 import subprocess
 import time
 import json
-import re
+import os
+import sys
+import hashlib
+import functools
+from pathlib import Path
 from datetime import datetime
 
+from stream import (_load_config, _atomic_write_json, _to_mbps, _to_bytes, _video_rates, _detect_hw_encoder,
+                    PSUTIL_AVAILABLE)
+from bandwidth_test import _PING_RE
+
+if PSUTIL_AVAILABLE:
+    import psutil
+
+# Banner / separator hanya untuk terminal, bukan untuk log yang di-redirect
+_IS_TTY = sys.stdout.isatty()
+_RULE = "=" * 60
+
+_BANNER = """
+    ╔════════════════════════════════════════════════════════╗
+    ║     YouTube ASMR Streaming Quality Debugger            ║
+    ║     Diagnose network and encoding issues               ║
+    ╚════════════════════════════════════════════════════════╝
+    
+"""
+
+_OPTIMAL_CONFIG = """
+{
+  "video": {
+    "codec": "copy",           ← No re-encoding = perfect quality
+    "bitrate": "22M"           ← Not used with 'copy', just for reference
+  },
+  "audio": {
+    "bitrate": "256k",         ← High quality for ASMR
+    "codec": "aac"
+  },
+  "streaming": {
+    "buffer_size": "50M"       ← Large buffer for stability
+  }
+}
+
+Why this is best:
+- 'copy' codec = zero quality loss
+- No CPU overhead from re-encoding
+- Original 22M bitrate preserved
+- Large buffer handles network fluctuations
+"""
+
+def _section(title):
+    """Print a section title, with separator when running in a terminal"""
+    sys.stdout.write(f"\n{title}\n{_RULE}\n" if _IS_TTY else f"\n{title}\n")
+
+def _headline(title):
+    """Print a title framed by separators when running in a terminal"""
+    sys.stdout.write(f"\n{_RULE}\n{title}\n{_RULE}\n" if _IS_TTY else f"\n{title}\n")
+
+# Cache hasil ffprobe di disk supaya debug berikutnya tidak spawn ffprobe lagi
+FFPROBE_CACHE_DIR = Path.home() / '.cache' / 'ytube-stream' / 'ffprobe'
+
+@functools.lru_cache(maxsize=128)
+def _ffprobe_cached(path, st=None):
+    """Get video stream info via ffprobe, cached on disk by (path, size, mtime)"""
+    st = st or os.stat(path)  # Callers that already stat'ed the file pass it in
+    key = f"{path}:{st.st_size}:{int(st.st_mtime)}:flat"
+    digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    cache_file = FFPROBE_CACHE_DIR / f"{digest}.json"
+    
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    
+    # Flat key=value output: cuma field yang dipakai, tanpa nested JSON
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', 
+         '-select_streams', 'v:0',
+         '-show_entries', 'stream=codec_name,width,height,r_frame_rate,bit_rate',
+         '-of', 'default=noprint_wrappers=1:nokey=0',
+         path],
+        capture_output=True,
+        text=True
+    )
+    fields = dict(line.split('=', 1) for line in result.stdout.splitlines() if '=' in line)
+    if not fields:
+        return fields  # Don't cache a failed probe
+    
+    _atomic_write_json(cache_file, fields)
+    return fields
+
 def check_network_to_youtube():
     """Check network latency and packet loss to YouTube"""
-    print("\n🌐 Testing Network to YouTube...")
-    print("=" * 60)
+    _section("🌐 Testing Network to YouTube...")
     
     try:
         # Ping YouTube RTMP servers
@@ -25,12 +111,11 @@ def check_network_to_youtube():
         
         output = result.stdout
         
-        # Extract statistics
-        loss_match = re.search(r'(\d+\.\d+)% packet loss', output)
-        time_match = re.search(r'min/avg/max/stddev = ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+)', output)
+        # Extract statistics (single pass)
+        m = _PING_RE.search(output)
         
-        if loss_match:
-            packet_loss = float(loss_match.group(1))
+        if m:
+            packet_loss = float(m.group('loss'))
             print(f"📦 Packet Loss: {packet_loss}%")
             
             if packet_loss > 5:
@@ -40,8 +125,8 @@ def check_network_to_youtube():
             else:
                 print("✅ No packet loss - Network stable")
         
-        if time_match:
-            avg_ping = float(time_match.group(2))
+        if m and m.group('avg'):
+            avg_ping = float(m.group('avg'))
             print(f"⏱️  Average Ping: {avg_ping:.1f}ms")
             
             if avg_ping > 150:
@@ -54,28 +139,33 @@ def check_network_to_youtube():
     except Exception as e:
         print(f"❌ Network test failed: {e}")
 
+def _config_codec(config):
+    """Video codec the streamer will really use ("auto" resolved the same way as ASMRStreamer)."""
+    codec = config['video']['codec']
+    if codec == 'auto':
+        codec = _detect_hw_encoder() or 'libx264'
+    return codec
+
 def check_upload_bandwidth():
     """Estimate upload bandwidth requirement"""
-    print("\n📊 Bandwidth Analysis...")
-    print("=" * 60)
+    _section("📊 Bandwidth Analysis...")
     
     # Load config
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
+        config = _load_config()
         
-        video_bitrate = config['video']['bitrate']
+        video_bitrate = _video_rates(config['video'], config['streaming'])[0]  # target_upload_mbps aware
         audio_bitrate = config['audio']['bitrate']
         
         # Parse bitrates
-        video_mbps = float(video_bitrate.rstrip('Mk'))
-        audio_kbps = float(audio_bitrate.rstrip('k'))
+        video_mbps = _to_mbps(video_bitrate)
+        audio_mbps = _to_mbps(audio_bitrate)
         
-        total_mbps = video_mbps + (audio_kbps / 1000)
+        total_mbps = video_mbps + audio_mbps
         recommended_mbps = total_mbps * 1.5  # 1.5x untuk overhead
         
         print(f"📹 Video Bitrate: {video_mbps} Mbps")
-        print(f"🎵 Audio Bitrate: {audio_kbps} kbps")
+        print(f"🎵 Audio Bitrate: {audio_mbps * 1000:g} kbps")
         print(f"📦 Total: {total_mbps:.2f} Mbps")
         print(f"🚀 Recommended Upload Speed: {recommended_mbps:.2f} Mbps (minimum)")
         print(f"⚡ Recommended Upload Speed: {recommended_mbps * 1.5:.2f} Mbps (stable)")
@@ -88,28 +178,62 @@ def check_upload_bandwidth():
     except Exception as e:
         print(f"❌ Config analysis failed: {e}")
 
-def check_ffmpeg_process():
-    """Check if FFmpeg is running and get stats"""
-    print("\n🎬 FFmpeg Process Status...")
-    print("=" * 60)
+def check_ffmpeg_process(pid=None):
+    """Check if FFmpeg is running and get stats (pid: skip the process scan)"""
+    _section("🎬 FFmpeg Process Status...")
     
     try:
-        result = subprocess.run(
-            ['ps', 'aux'],
-            capture_output=True,
-            text=True
-        )
-        
-        ffmpeg_lines = [line for line in result.stdout.split('\n') if 'ffmpeg' in line.lower() and 'grep' not in line]
+        if pid is not None:
+            pids = [pid]  # Caller already knows the PID
+        else:
+            # Exact process name: -f would also match shells, `tail -f ffmpeg.log`, etc.
+            result = subprocess.run(
+                ['pgrep', '-x', 'ffmpeg'],
+                capture_output=True,
+                text=True
+            )
+            pids = [int(line) for line in result.stdout.split()]
         
-        if ffmpeg_lines:
-            print("✅ FFmpeg is running:")
-            for line in ffmpeg_lines:
-                parts = line.split()
-                if len(parts) > 10:
-                    cpu = parts[2]
-                    mem = parts[3]
-                    print(f"   CPU: {cpu}% | RAM: {mem}%")
+        if pids:
+            print("✅ FFmpeg is running:" if pid is None else f"🔎 FFmpeg PID {pid}:")
+            if PSUTIL_AVAILABLE:
+                # Prime every process first, then one shared sample window
+                # instead of a blocking interval per process
+                procs = []
+                for proc_pid in pids:
+                    try:
+                        p = psutil.Process(proc_pid)
+                        p.cpu_percent(interval=None)
+                        procs.append(p)
+                    except psutil.NoSuchProcess:
+                        print(f"   ❌ PID {proc_pid} is no longer running")
+                    except psutil.AccessDenied:
+                        pass
+                if procs:
+                    time.sleep(0.1)
+                for p in procs:
+                    try:
+                        with p.oneshot():
+                            cpu = p.cpu_percent(interval=None)
+                            mem_mb = p.memory_info().rss / (1024**2)
+                            mem = p.memory_percent()
+                        print(f"   CPU: {cpu:.1f}% | RAM: {mem:.1f}% ({mem_mb:.1f} MB)")
+                    except psutil.NoSuchProcess:
+                        print(f"   ❌ PID {p.pid} is no longer running")
+                    except psutil.AccessDenied:
+                        pass
+            else:
+                ps = subprocess.run(
+                    ['ps', '-o', 'pid=,pcpu=,pmem=', '-p', ','.join(map(str, pids))],
+                    capture_output=True,
+                    text=True
+                )
+                for line in ps.stdout.splitlines():
+                    parts = line.split()
+                    if len(parts) == 3:
+                        cpu = parts[1]
+                        mem = parts[2]
+                        print(f"   CPU: {cpu}% | RAM: {mem}%")
         else:
             print("❌ FFmpeg is not running")
             
@@ -118,33 +242,21 @@ def check_ffmpeg_process():
 
 def check_video_source():
     """Analyze video source quality"""
-    print("\n🎥 Video Source Analysis...")
-    print("=" * 60)
+    _section("🎥 Video Source Analysis...")
     
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
+        config = _load_config()
         
         video_file = config['video']['file']
         
-        # Get video info
-        result = subprocess.run(
-            ['ffprobe', '-v', 'error', 
-             '-select_streams', 'v:0',
-             '-show_entries', 'stream=codec_name,width,height,r_frame_rate,bit_rate',
-             '-of', 'json',
-             video_file],
-            capture_output=True,
-            text=True
-        )
-        
-        data = json.loads(result.stdout)
-        if 'streams' in data and len(data['streams']) > 0:
-            stream = data['streams'][0]
-            codec = stream.get('codec_name', 'unknown')
-            width = stream.get('width', 0)
-            height = stream.get('height', 0)
-            bitrate = int(stream.get('bit_rate', 0)) / 1_000_000
+        # Get video info (cached, keyed by the same stat result)
+        fields = _ffprobe_cached(video_file, os.stat(video_file))
+        if fields:
+            codec = fields.get('codec_name', 'unknown')
+            width = int(fields.get('width', 0))
+            height = int(fields.get('height', 0))
+            bit_rate = fields.get('bit_rate', '0')
+            bitrate = (int(bit_rate) if bit_rate.isdigit() else 0) / 1_000_000  # "N/A" for some containers
             
             print(f"📁 Source File: {video_file}")
             print(f"🎞️  Codec: {codec}")
@@ -152,8 +264,8 @@ def check_video_source():
             print(f"💾 Source Bitrate: {bitrate:.1f} Mbps")
             
             # Compare with config
-            config_codec = config['video']['codec']
-            config_bitrate = float(config['video']['bitrate'].rstrip('Mk'))
+            config_codec = _config_codec(config)
+            config_bitrate = _to_mbps(_video_rates(config['video'], config['streaming'])[0])
             
             print(f"\n🔄 Encoding Settings:")
             print(f"   Target Codec: {config_codec}")
@@ -175,15 +287,14 @@ def check_video_source():
 
 def get_recommendations():
     """Provide recommendations based on analysis"""
-    print("\n💡 Recommendations...")
-    print("=" * 60)
+    _section("💡 Recommendations...")
     
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
+        config = _load_config()
         
-        codec = config['video']['codec']
-        bitrate = float(config['video']['bitrate'].rstrip('Mk'))
+        codec = _config_codec(config)
+        streaming = config['streaming']
+        bitrate = _to_mbps(_video_rates(config['video'], streaming)[0])
         preset = config['video'].get('preset', 'medium')
         
         recommendations = []
@@ -214,71 +325,50 @@ def get_recommendations():
                 "   Use 'medium' or 'slow' for better quality, or 'copy' for best quality"
             )
         
-        # Buffer size
-        buffer_size = config['streaming'].get('buffer_size', '20M')
-        buffer_mb = int(buffer_size.rstrip('M'))
-        if buffer_mb < 30:
+        # Buffer size (derived from the upload target when target_upload_mbps is set)
+        buffer_size = streaming.get('buffer_size', '20M')
+        buffer_mb = _to_bytes(buffer_size) / 1e6
+        if buffer_mb < 30 and not streaming.get('target_upload_mbps'):
             recommendations.append(
                 f"📦 STABILITY: Buffer size ({buffer_size}) could be larger\n"
                 "   Increase to 40M or 50M for better network stability"
             )
         
         if recommendations:
-            for i, rec in enumerate(recommendations, 1):
-                print(f"\n{i}. {rec}")
+            print('\n' + '\n\n'.join(f"{i}. {rec}" for i, rec in enumerate(recommendations, 1)))
         else:
             print("\n✅ Configuration looks good!")
             
         # Optimal config suggestion
-        print("\n" + "=" * 60)
-        print("🎯 OPTIMAL CONFIG for 2K ASMR (no quality loss):")
-        print("=" * 60)
-        print("""
-{
-  "video": {
-    "codec": "copy",           ← No re-encoding = perfect quality
-    "bitrate": "22M"           ← Not used with 'copy', just for reference
-  },
-  "audio": {
-    "bitrate": "256k",         ← High quality for ASMR
-    "codec": "aac"
-  },
-  "streaming": {
-    "buffer_size": "50M"       ← Large buffer for stability
-  }
-}
-
-Why this is best:
-- 'copy' codec = zero quality loss
-- No CPU overhead from re-encoding
-- Original 22M bitrate preserved
-- Large buffer handles network fluctuations
-        """)
+        _headline("🎯 OPTIMAL CONFIG for 2K ASMR (no quality loss):")
+        sys.stdout.write(_OPTIMAL_CONFIG)
         
     except Exception as e:
         print(f"❌ Recommendation generation failed: {e}")
 
-def main():
+def main(ffmpeg_pid=None):
     """Main debug function"""
-    print("""
-    ╔════════════════════════════════════════════════════════╗
-    ║     YouTube ASMR Streaming Quality Debugger            ║
-    ║     Diagnose network and encoding issues               ║
-    ╚════════════════════════════════════════════════════════╝
-    """)
+    if _IS_TTY:
+        sys.stdout.write(_BANNER)
     
     print(f"🕐 Debug started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
+    # Load config sekali di awal (cached untuk semua checks)
+    try:
+        _load_config()
+    except Exception as e:
+        print(f"❌ Could not load config.json: {e}")
+        sys.exit(1)
+    
     # Run all checks
     check_video_source()
     check_network_to_youtube()
     check_upload_bandwidth()
-    check_ffmpeg_process()
+    check_ffmpeg_process(ffmpeg_pid)
     get_recommendations()
     
-    print("\n" + "=" * 60)
-    print("✅ Debug complete!")
-    print("=" * 60)
+    _headline("✅ Debug complete!")
+    sys.stdout.flush()
 
 if __name__ == '__main__':
     main()
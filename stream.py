@@ -11,6 +11,14 @@ import logging
 import os
 import sys
 import threading
+import functools
+import re
+import collections
+import hashlib
+import tempfile
+import signal
+import shutil
+import wave
 from pathlib import Path
 from datetime import datetime
 
@@ -20,17 +28,369 @@ try:
     PSUTIL_AVAILABLE = True
 except ImportError:
     PSUTIL_AVAILABLE = False
-    print("Warning: psutil not installed. Monitoring disabled.")
+    print("Warning: psutil not installed. CPU/RAM monitoring disabled.")
+
+# Optional: mutagen reads duration from container headers (no ffprobe fork)
+try:
+    import mutagen
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
+# FFmpeg ends progress lines with \r, log lines with \n
+_LINE_SPLIT_RE = re.compile(rb'[\r\n]+')
+
+# Exit codes that mean FFmpeg stopped on purpose (255 = stopped via 'q'/signal)
+_CLEAN_EXIT_CODES = (0, 255, -signal.SIGTERM)
+# Config/input errors in FFmpeg's last lines. Fatal only if the session never produced
+# a frame or the same error repeats on back-to-back attempts (some also happen at
+# runtime, e.g. muxer "Invalid argument"); any other crash is worth a restart
+_FATAL_RE = re.compile(
+    rb'no such file or directory|unknown encoder|encoder not found|invalid argument|'
+    rb'unrecognized option|option not found|error parsing|permission denied|'
+    rb'invalid data found when processing input',
+    re.IGNORECASE
+)
+
+# FFmpeg stderr lines worth showing on the console
+_IMPORTANT_RE = re.compile(rb'error|warning|failed|invalid', re.IGNORECASE)
+
+# FFmpeg stderr log: scan interval and size before rotating to <file>.1
+FFMPEG_LOG_POLL_SECONDS = 2
+FFMPEG_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# Crossfade overlap between the end and the start of the audio loop
+CROSSFADE_SECONDS = 8
+
+# Default VBR ceiling: maxrate = bitrate * factor (override with video.maxrate)
+VBR_MAXRATE_FACTOR = 1.5
+
+# How many times the video is listed in its concat playlist
+VIDEO_CONCAT_REPEAT = 100
+
+# split_mux: packets the RTMP muxer may queue from the FIFO while the upload
+# stalls (~25s of 30fps video + AAC), so the encoder keeps running
+MUX_THREAD_QUEUE_SIZE = 2048
+
+# video.codec "auto": hardware H.264 encoders tried in this order, libx264 as fallback.
+# Result cached per FFmpeg binary; delete the file to re-detect after a GPU/driver change
+HW_ENCODERS = ('h264_nvenc', 'h264_qsv', 'h264_vaapi', 'h264_videotoolbox')
+VAAPI_DEVICE = '/dev/dri/renderD128'
+HWENC_CACHE_FILE = Path.home() / '.cache' / 'ytube-stream' / 'hwenc.json'
+
+# FFmpeg's speed= is a lifetime average; current speed is out_time growth over the
+# last SPEED_WINDOW_SECONDS of wall clock, ignored for SPEED_WARMUP_SECONDS after start
+SPEED_WINDOW_SECONDS = 5
+SPEED_WARMUP_SECONDS = 10
+SLOW_SPEED = 0.95
+
+# adaptive_bitrate, on the current speed (see above):
+# < SLOW_SPEED for SLOW_AFTER seconds -> restart at bitrate * STEP_DOWN;
+# >= RECOVER_SPEED for RAISE_AFTER seconds -> restart at bitrate * STEP_UP (capped at config)
+ADAPTIVE_SLOW_AFTER = 15
+ADAPTIVE_RECOVER_SPEED = 0.99
+ADAPTIVE_STEP_DOWN = 0.8
+ADAPTIVE_STEP_UP = 1.05
+ADAPTIVE_RAISE_AFTER = 60
+ADAPTIVE_MIN_SCALE = 0.5
+
+# Banner hanya untuk terminal, bukan untuk log yang di-redirect
+_IS_TTY = sys.stdout.isatty()
+
+_BANNER = """
+    ╔════════════════════════════════════════════════════════╗
+    ║   Lightweight YouTube ASMR Streaming Application       ║
+    ║   Optimized for minimal CPU/RAM usage                  ║
+    ╚════════════════════════════════════════════════════════╝
+    
+"""
+
+# FFmpeg-style SI suffixes ("10M", "256k", "1G")
+_MBPS_SUFFIX = {'k': 1e-3, 'K': 1e-3, 'm': 1.0, 'M': 1.0, 'g': 1e3, 'G': 1e3}
+_BYTES_SUFFIX = {'k': 1e3, 'K': 1e3, 'm': 1e6, 'M': 1e6, 'g': 1e9, 'G': 1e9}
+
+
+def _to_mbps(value):
+    """Convert a rate string like '10M' or '256k' to Mbps."""
+    value = value.strip()
+    mult = _MBPS_SUFFIX.get(value[-1])
+    return float(value[:-1]) * mult if mult else float(value) * 1e-6
+
+
+def _to_bytes(value):
+    """Convert a size string like '20M' to bytes."""
+    value = value.strip()
+    mult = _BYTES_SUFFIX.get(value[-1])
+    return float(value[:-1]) * mult if mult else float(value)
+
+
+def _video_rates(video, streaming):
+    """Effective (bitrate, maxrate, bufsize) for the video encoder, as FFmpeg rate strings."""
+    # Optional single knob: derive all three rates from the upload target
+    # Maximum bandwidth = input rate * (1 + overhead / 100)
+    target_mbps = streaming.get('target_upload_mbps')
+    if target_mbps:
+        max_mbps = target_mbps * (1 + streaming.get('overhead_percent', 15) / 100)
+        return f"{target_mbps:g}M", f"{max_mbps:g}M", f"{2 * max_mbps:g}M"
+    
+    bitrate = video['bitrate']
+    # VBR: maxrate di atas bitrate supaya x264 tidak buang cycle untuk
+    # mengisi bitrate di scene yang mudah dikompres (nal-hrd=cbr tetap off)
+    maxrate = video.get('maxrate') or f"{_to_mbps(bitrate) * VBR_MAXRATE_FACTOR:g}M"
+    return bitrate, maxrate, streaming['buffer_size']
+
+
+def _iter_lines(pipe):
+    """Yield raw lines from an unbuffered pipe, splitting on both \\r and \\n."""
+    pending = b''
+    for chunk in iter(lambda: pipe.read(65536), b''):
+        *lines, pending = _LINE_SPLIT_RE.split(pending + chunk)
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _atomic_write_json(path, obj):
+    """Write JSON via tmp file + rename, creating the parent dir; best-effort (cache files)."""
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(obj, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # e.g. read-only assets folder or home dir
+
+
+def _write_concat_playlist(path, repeat, prefix, options=()):
+    """Write an ffconcat playlist listing path `repeat` times; return its path.
+    
+    `options` are (key, value) demuxer options applied to every entry: concat
+    opens each entry as its own input, so -probesize etc. on the command line
+    only reach the outer concat demuxer.
+    """
+    abs_path = os.path.abspath(path)
+    digest = hashlib.blake2b(abs_path.encode(), digest_size=8).hexdigest()
+    playlist = os.path.join(tempfile.gettempdir(), f"{prefix}_{digest}.txt")
+    
+    entry = "file '{}'\n".format(abs_path.replace("'", "'\\''"))  # ffconcat quoting
+    entry += "".join(f"option {key} {value}\n" for key, value in options)
+    tmp_path = f"{playlist}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write("ffconcat version 1.0\n")
+        f.write(entry * repeat)
+    os.replace(tmp_path, playlist)
+    return playlist
+
+
+@functools.lru_cache(maxsize=1)
+def _concat_supports_options():
+    """Whether the concat demuxer knows the per-entry 'option' directive (FFmpeg 5.0+)."""
+    try:
+        out = subprocess.run(['ffmpeg', '-hide_banner', '-version'], stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    m = re.match(rb'ffmpeg version n?(\d+)\.', out)
+    return not m or int(m.group(1)) >= 5  # git snapshots ("N-1234-g...") are recent
+
+
+def _crossfade_loop_filter(crossfade):
+    """Filter that turns one audio track into a seamless, self-crossfading loop.
+    
+    Expects the same file as inputs 0 and 1. Body (crossfade..end) gets its
+    tail crossfaded into the head (0..crossfade), so the result ends exactly
+    where the next repetition's body begins.
+    """
+    return (
+        f"[0:a]atrim=start={crossfade},asetpts=PTS-STARTPTS[body];"
+        f"[1:a]atrim=end={crossfade},asetpts=PTS-STARTPTS[head];"
+        f"[body][head]acrossfade=d={crossfade}:c1=qsin:c2=qsin[aout]"
+    )
+
+
+def _render_crossfade_loop(audio_file, st, crossfade=CROSSFADE_SECONDS):
+    """Pre-render the crossfaded audio loop once (lossless FLAC), cached by file stat.
+    
+    Returns the loop file path, or None if FFmpeg could not render it.
+    """
+    key = f"{os.path.abspath(audio_file)}:{st.st_size}:{st.st_mtime_ns}:{crossfade}"
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    loop_path = os.path.join(tempfile.gettempdir(), f"asmr_audio_loop_{digest}.flac")
+    if os.path.exists(loop_path):
+        return loop_path
+    
+    print(f"Rendering crossfaded audio loop ({crossfade}s)...")
+    tmp_path = f"{loop_path}.{os.getpid()}.tmp.flac"
+    result = subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-i', audio_file,
+        '-i', audio_file,  # Second decoder only for this one-off render
+        '-filter_complex', _crossfade_loop_filter(crossfade),
+        '-map', '[aout]',
+        '-c:a', 'flac',
+        tmp_path
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    
+    if result.returncode != 0:
+        print(f"Warning: Could not render crossfade loop: {result.stderr.decode('utf-8', 'replace').strip()}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return None
+    
+    os.replace(tmp_path, loop_path)
+    return loop_path
+
+
+def _header_duration(path):
+    """Read duration from the file header (mutagen, or stdlib wave for WAV); None if unknown."""
+    if MUTAGEN_AVAILABLE:
+        try:
+            info = mutagen.File(path)
+            if info is not None and info.info.length:
+                return float(info.info.length)
+        except Exception:
+            pass
+    if path.lower().endswith('.wav'):
+        try:
+            with wave.open(path, 'rb') as w:
+                return w.getnframes() / w.getframerate()
+        except (wave.Error, EOFError, OSError, ZeroDivisionError):
+            pass
+    return None
+
+
+def _hw_encoder_works(encoder):
+    """Encode one tiny frame to check that the encoder's device/driver is really usable."""
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error']
+    upload = []
+    if encoder == 'h264_vaapi':
+        cmd += ['-vaapi_device', VAAPI_DEVICE]
+        upload = ['-vf', 'format=nv12,hwupload']
+    cmd += ['-f', 'lavfi', '-i', 'color=black:s=256x256:r=30', *upload,
+            '-frames:v', '1', '-c:v', encoder, '-f', 'null', '-']
+    try:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              timeout=15).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_hw_encoder():
+    """First working hardware H.264 encoder ('' if none), cached on disk per FFmpeg binary."""
+    ffmpeg_path = shutil.which('ffmpeg')
+    if not ffmpeg_path:
+        return ''
+    st = os.stat(ffmpeg_path)
+    key = f"{os.path.realpath(ffmpeg_path)}:{st.st_size}:{st.st_mtime_ns}"
+    
+    try:
+        with open(HWENC_CACHE_FILE, 'r') as f:
+            cached = json.load(f)
+        if cached['key'] == key:
+            return cached['encoder']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    # Compiled in (-encoders) doesn't mean a GPU is present: test-encode each candidate
+    try:
+        listed = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return ''
+    encoder = next((name for name in HW_ENCODERS
+                    if f' {name} '.encode() in listed and _hw_encoder_works(name)), '')
+    
+    _atomic_write_json(HWENC_CACHE_FILE, {'key': key, 'encoder': encoder})
+    return encoder
+
+
+def _probe_duration(path):
+    """Get duration with ffprobe (fallback when the header can't be read); None on failure."""
+    try:
+        result = subprocess.run([
+            'ffprobe',
+            '-v', 'error',
+            '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1',
+            path
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10)
+        return float(result.stdout)  # Raw ASCII bytes; float() ignores the trailing newline
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def audio_duration(path, st=None):
+    """Audio duration in seconds via a <file>.duration.json sidecar, the header, or ffprobe.
+    
+    Returns (duration, cached); duration is None if it could not be detected.
+    """
+    st = st or os.stat(path)  # ASMRStreamer passes the stat from validate_config
+    cache_path = Path(path + '.duration.json')
+    
+    # Sidecar masih valid kalau mtime + size file audio sama
+    try:
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+        if cached['mtime_ns'] == st.st_mtime_ns and cached['size'] == st.st_size:
+            return float(cached['duration']), True
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    # Header dulu (tanpa subprocess), ffprobe hanya sebagai fallback
+    duration = _header_duration(path) or _probe_duration(path)
+    if duration is None:
+        return None, False
+    
+    _atomic_write_json(cache_path, {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'duration': duration})
+    return duration, False
+
+
+def _rotate_log(path, max_bytes):
+    """Move path to path + '.1' once it grows past max_bytes."""
+    try:
+        if os.path.getsize(path) > max_bytes:
+            os.replace(path, path + '.1')
+    except OSError:
+        pass  # Not created yet
+
+
+class ConfigError(Exception):
+    """Config points at missing files or still has placeholder values."""
+    
+    def __init__(self, problems):
+        self.problems = problems  # [(message, hint), ...]
+        super().__init__("; ".join(message for message, _ in problems))
+
+
+def _load_config(path='config.json'):
+    """Load and parse a JSON config file once per process."""
+    # Normalize the key: 'config.json', './config.json' and no argument share one entry
+    return _load_config_abs(os.path.abspath(path))
+
+
+@functools.lru_cache(maxsize=1)
+def _load_config_abs(path):
+    """Cached parse of an absolute config path (use _load_config)."""
+    with open(path, 'r') as f:
+        return json.load(f)
 
 
 class StreamMonitor:
     """Monitor CPU and RAM usage during streaming."""
     
     def __init__(self, config):
-        self.enabled = config.get('monitoring', {}).get('enabled', False) and PSUTIL_AVAILABLE
+        self.enabled = config.get('monitoring', {}).get('enabled', False)
+        self.use_psutil = self.enabled and PSUTIL_AVAILABLE
         self.log_interval = config.get('monitoring', {}).get('log_interval_seconds', 30)
         self.log_file = config.get('monitoring', {}).get('log_file', 'stream_monitor.log')
-        self.last_log_time = 0
+        self._next_log_time = 0.0  # time.monotonic() deadline
+        self.last_stats_msg = None
+        self._proc = None
         
         if self.enabled:
             logging.basicConfig(
@@ -39,38 +399,73 @@ class StreamMonitor:
                 format='%(asctime)s - %(message)s'
             )
             logging.info("Stream monitoring started")
+        if self.use_psutil:
+            psutil.cpu_percent(interval=None)  # Prime so log_stats never blocks
     
-    def log_stats(self, process_pid=None):
-        """Log current CPU and RAM usage."""
-        if not self.enabled:
+    def track_process(self, pid):
+        """Start tracking an FFmpeg process (primes its non-blocking CPU counter)."""
+        if not self.use_psutil:
             return
+        try:
+            self._proc = psutil.Process(pid)
+            self._proc.cpu_percent(interval=None)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            self._proc = None
+    
+    def log_stats(self, process_pid=None, ffmpeg_stats=None):
+        """Log FFmpeg progress stats plus current CPU and RAM usage.
         
-        current_time = time.time()
-        if current_time - self.last_log_time < self.log_interval:
-            return
+        Returns the latest stats message; called again before the interval has
+        elapsed it returns the cached message without sampling anything.
+        """
+        if not self.enabled:
+            return None
         
-        self.last_log_time = current_time
+        # Monotonic gate before any psutil work (immune to wall-clock jumps)
+        now = time.monotonic()
+        if now < self._next_log_time:
+            return self.last_stats_msg
+        self._next_log_time = now + self.log_interval
         
-        # System stats
-        cpu_percent = psutil.cpu_percent(interval=1)
-        mem = psutil.virtual_memory()
-        mem_percent = mem.percent
-        mem_used_gb = mem.used / (1024**3)
+        parts = []
         
-        stats_msg = f"CPU: {cpu_percent}% | RAM: {mem_percent}% ({mem_used_gb:.2f} GB)"
+        # Encoder health, straight from FFmpeg's -progress output
+        if ffmpeg_stats:
+            parts.append(
+                f"FPS: {ffmpeg_stats.get('fps', 0):.1f} | Bitrate: {ffmpeg_stats.get('bitrate', 'N/A')} | "
+                f"Speed: {ffmpeg_stats.get('speed', 0):.2f}x | Drop: {ffmpeg_stats.get('drop_frames', 0)} | "
+                f"Dup: {ffmpeg_stats.get('dup_frames', 0)}"
+            )
         
-        # FFmpeg process stats
-        if process_pid:
-            try:
-                process = psutil.Process(process_pid)
-                proc_cpu = process.cpu_percent(interval=0.1)
-                proc_mem = process.memory_info().rss / (1024**2)  # MB
-                stats_msg += f" | FFmpeg CPU: {proc_cpu}% | FFmpeg RAM: {proc_mem:.1f} MB"
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+        if self.use_psutil:
+            # System stats
+            cpu_percent = psutil.cpu_percent(interval=None)
+            mem = psutil.virtual_memory()
+            mem_percent = mem.percent
+            mem_used_gb = mem.used / (1024**3)
+            parts.append(f"CPU: {cpu_percent}% | RAM: {mem_percent}% ({mem_used_gb:.2f} GB)")
+            
+            # FFmpeg process stats
+            if process_pid:
+                if self._proc is None or self._proc.pid != process_pid:
+                    self.track_process(process_pid)
+                if self._proc is not None:
+                    try:
+                        with self._proc.oneshot():  # One /proc read for both values
+                            proc_cpu = self._proc.cpu_percent(interval=None)  # Average since last call
+                            proc_mem = self._proc.memory_info().rss / (1024**2)  # MB
+                        parts.append(f"FFmpeg CPU: {proc_cpu}% | FFmpeg RAM: {proc_mem:.1f} MB")
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        pass
+        
+        if not parts:
+            return self.last_stats_msg
         
+        stats_msg = " | ".join(parts)
+        self.last_stats_msg = stats_msg
         logging.info(stats_msg)
         print(f"[MONITOR] {stats_msg}")
+        return stats_msg
 
 
 class ASMRStreamer:
@@ -81,161 +476,224 @@ class ASMRStreamer:
         self.config = self.load_config()
         self.monitor = StreamMonitor(self.config)
         self.process = None
+        self._stderr_tail = collections.deque(maxlen=200)
+        # Important FFmpeg lines (error/warning), dumped on demand instead of printed
+        self._log_ring = collections.deque(maxlen=200)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self._dump_log_ring)
+        self._ready_event = threading.Event()
+        self._exited_event = threading.Event()
+        self.stats = {}
+        self._audio_duration = None
+        # Only active under run_with_auto_restart, which relaunches FFmpeg
+        self._adaptive = False
+        self._bitrate_scale = 1.0  # Multiplier on config bitrate/maxrate
+        self._pending_scale = None  # Set when a bitrate restart was requested
+        self._speed_samples = collections.deque()  # (monotonic, out_time_us) pairs
+        self._session_started = time.monotonic()
+        self._last_fatal = None  # _FATAL_RE match of the previous attempt
+        self._got_frames = False  # Current session encoded at least one frame
         self.validate_config()
+        self._ffmpeg_log_path = self.config['streaming'].get('ffmpeg_log_file', 'ffmpeg.log')
+        self._youtube_url = f"{self.config['youtube']['rtmp_url']}/{self.config['youtube']['stream_key']}"
+        # "auto": pakai encoder hardware kalau ada, CPU (libx264) kalau tidak
+        self._video_codec = self.config['video']['codec']
+        if self._video_codec == 'auto':
+            self._video_codec = _detect_hw_encoder() or 'libx264'
+            print(f"Video encoder: {self._video_codec}")
+        # Config tidak berubah selama proses jalan: build argv sekali sebagai template,
+        # reconnect cuma isi ulang slot output (index terakhir) dan video bitrate
+        self._ffmpeg_argv_template = tuple(self.build_ffmpeg_command(self._video_codec))
+        self._output_index = len(self._ffmpeg_argv_template) - 1
+        self._rate_slots = [
+            (i + 1, _to_mbps(self._ffmpeg_argv_template[i + 1]))
+            for i, arg in enumerate(self._ffmpeg_argv_template) if arg in ('-b:v', '-maxrate')
+        ]
+        self._split_mux = self.config['streaming'].get('split_mux', False)
+        self.mux_process = None
     
     def load_config(self):
         """Load configuration from JSON file."""
-        if not os.path.exists(self.config_path):
+        try:
+            return _load_config(self.config_path)
+        except FileNotFoundError:
             print(f"Error: Config file '{self.config_path}' not found!")
             print("Please copy 'config.example.json' to 'config.json' and configure it.")
             sys.exit(1)
-        
-        with open(self.config_path, 'r') as f:
-            return json.load(f)
     
     def validate_config(self):
-        """Validate that required files and settings exist."""
-        video_file = self.config['video']['file']
-        audio_file = self.config['audio']['file']
-        
-        if not os.path.exists(video_file):
-            print(f"Error: Video file '{video_file}' not found!")
-            print("Please place your video loop file in the assets/ folder and update config.json")
-            sys.exit(1)
-        
-        if not os.path.exists(audio_file):
-            print(f"Error: Audio file '{audio_file}' not found!")
-            print("Please place your audio loop file in the assets/ folder and update config.json")
-            sys.exit(1)
+        """Validate that required files and settings exist, raising ConfigError with every problem."""
+        # One pass, one stat per file; results are kept for cache keys (size/mtime)
+        checks = [('video', self.config['video']['file']), ('audio', self.config['audio']['file'])]
+        stats = {}
+        problems = []
+        for kind, path in checks:
+            try:
+                stats[kind] = os.stat(path)
+            except OSError:
+                problems.append((
+                    f"{kind.capitalize()} file '{path}' not found",
+                    f"Please place your {kind} loop file in the assets/ folder and update config.json"
+                ))
         
         if self.config['youtube']['stream_key'] == 'YOUR_STREAM_KEY_HERE':
-            print("Error: Please configure your YouTube stream key in config.json")
-            sys.exit(1)
+            problems.append((
+                "YouTube stream key is not configured",
+                "Please configure your YouTube stream key in config.json"
+            ))
+        
+        if problems:
+            raise ConfigError(problems)
+        self._video_stat = stats['video']
+        self._audio_stat = stats['audio']
     
     def get_audio_duration(self):
-        """Get audio file duration in seconds using ffprobe."""
-        try:
-            result = subprocess.run([
-                'ffprobe',
-                '-v', 'error',
-                '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                self.config['audio']['file']
-            ], capture_output=True, text=True, timeout=10)
-            
-            duration = float(result.stdout.strip())
-            print(f"Audio duration: {duration:.2f} seconds")
-            return duration
-        except Exception as e:
-            print(f"Warning: Could not detect audio duration: {e}")
+        """Get audio file duration in seconds (memoized; see audio_duration)."""
+        if self._audio_duration is not None:
+            return self._audio_duration
+        
+        duration, cached = audio_duration(self.config['audio']['file'], self._audio_stat)
+        if duration is None:
+            print("Warning: Could not detect audio duration")
             print("Crossfade will be disabled.")
             return None
+        print(f"Audio duration: {duration:.2f} seconds{' (cached)' if cached else ''}")
+        self._audio_duration = duration
+        return duration
+    
+    def _write_video_playlist(self):
+        """Write the video concat playlist (same path every time for the same video file)."""
+        options = self._video_probe if _concat_supports_options() else ()
+        return _write_concat_playlist(self.config['video']['file'], VIDEO_CONCAT_REPEAT,
+                                      'asmr_concat', options)
+    
+    def _ensure_stream_inputs(self):
+        """Recreate the temp playlist / audio loop the argv template points to if /tmp was cleaned.
+        
+        Paths are deterministic, so the template stays valid; costs one stat each per start.
+        """
+        if not os.path.exists(self._video_playlist):
+            print("Video playlist missing (tmp cleanup?), rewriting it")
+            self._write_video_playlist()
+        if self._audio_loop_file and not os.path.exists(self._audio_loop_file):
+            print("Audio loop missing (tmp cleanup?), rendering it again")
+            if not _render_crossfade_loop(self.config['audio']['file'], self._audio_stat, CROSSFADE_SECONDS):
+                print("Warning: FFmpeg will fail to open the audio loop")
     
-    def build_ffmpeg_command(self):
-        """Build FFmpeg command for streaming with separate video/audio loops."""
-        youtube_url = f"{self.config['youtube']['rtmp_url']}/{self.config['youtube']['stream_key']}"
+    def build_ffmpeg_command(self, codec):
+        """Build FFmpeg command for streaming with separate video/audio loops (codec already resolved)."""
+        video = self.config['video']
+        audio = self.config['audio']
+        streaming = self.config['streaming']
         
-        # Get audio duration for crossfade
+        # Audio loop: crossfade di-render sekali ke file loop yang seamless, jadi
+        # saat streaming cukup satu input audio tanpa filter graph
         audio_duration = self.get_audio_duration()
-        crossfade_duration = 8  # 8 seconds crossfade overlap
+        crossfade_duration = CROSSFADE_SECONDS
+        audio_input = audio['file']
+        self._audio_loop_file = None
+        if audio_duration and audio_duration > crossfade_duration * 2:
+            loop_file = _render_crossfade_loop(audio['file'], self._audio_stat, crossfade_duration)
+            if loop_file:
+                audio_input = self._audio_loop_file = loop_file
+                print(f"✅ Infinite loop dengan smooth crossfade {crossfade_duration}s di setiap loop")
+        elif audio_duration:
+            print(f"⚠️  Audio too short ({audio_duration}s) for {crossfade_duration}s crossfade")
+        
+        # Probe kecil: dengan codec copy container sudah cukup mendeskripsikan stream
+        if codec == 'copy':
+            probesize = video.get('probesize', '1M')
+            analyzeduration = video.get('analyzeduration', '1000000')
+        else:
+            probesize = video.get('probesize', '5M')
+            analyzeduration = video.get('analyzeduration', '5000000')
+        self._video_probe = (('probesize', probesize), ('analyzeduration', analyzeduration))
+        
+        # Video loop via concat demuxer: playlist berisi file yang sama berkali-kali,
+        # jadi timestamp tetap kontinu di setiap wrap-around. Tiap entry tetap dibuka
+        # dan di-probe ulang (plain -stream_loop cukup seek), karena itu probe options
+        # ditulis per entry di playlist
+        video_playlist = self._video_playlist = self._write_video_playlist()
         
         # FFmpeg command for looping video and audio separately
         # Using large buffers for pre-encoding stability
         cmd = [
             'ffmpeg',
+            # VAAPI device must be opened before the inputs
+            *(['-vaapi_device', VAAPI_DEVICE] if codec == 'h264_vaapi' else []),
             # Video input with loop
-            '-stream_loop', '-1',  # Infinite loop for video
+            '-f', 'concat',
+            '-safe', '0',  # Absolute paths in playlist
+            '-stream_loop', '-1',  # Infinite loop over the playlist
             '-re',  # Read input at native frame rate
-            '-i', self.config['video']['file'],
-            # Audio input 1 with loop (untuk crossfade overlap)
-            '-stream_loop', '-1',
-            '-i', self.config['audio']['file'],
-            # Audio input 2 with loop (duplicate untuk overlap)
+            '-i', video_playlist,  # Probe options live in the playlist entries
+            # Audio input with loop (already crossfaded if possible)
             '-stream_loop', '-1',
-            '-i', self.config['audio']['file'],
+            '-probesize', '1M',  # Audio gets its own small probe
+            '-analyzeduration', '1000000',
+            '-i', audio_input,
             
             # Video encoding settings
             '-map', '0:v:0',  # Video from first input
-            '-c:v', self.config['video']['codec'],
+            '-c:v', codec,
         ]
         
         # Add encoding parameters only if not using copy codec
-        if self.config['video']['codec'] != 'copy':
-            keyframe_interval = self.config['video'].get('keyframe_interval', 2)
+        if codec != 'copy':
+            keyframe_interval = video.get('keyframe_interval', 2)
             gop_size = 30 * keyframe_interval  # fps * seconds
-            maxrate = self.config['video'].get('maxrate', self.config['video']['bitrate'])
-            tune = self.config['video'].get('tune', None)
-            
-            cmd.extend([
-                '-preset', self.config['video']['preset'],
-                '-b:v', self.config['video']['bitrate'],
-                '-maxrate', maxrate,
-                '-bufsize', self.config['streaming']['buffer_size'],
-                '-s', self.config['video']['resolution'],
-                '-r', '30',  # 30 fps
-                '-g', str(gop_size),  # Keyframe interval
-                '-keyint_min', str(gop_size),  # Minimum keyframe interval
-                '-sc_threshold', '0',  # Disable scene change detection
-                '-pix_fmt', 'yuv420p',
-                '-profile:v', 'high',  # H.264 High profile
-                '-level', '4.2',  # Level for 2K
-            ])
-            
-            # Add tune if specified (film, animation, etc)
-            if tune:
-                cmd.extend(['-tune', tune])
+            bitrate, maxrate, bufsize = _video_rates(video, streaming)
             
-            # Additional quality settings for veryfast/faster presets
-            if self.config['video']['preset'] in ['veryfast', 'faster', 'fast']:
-                cmd.extend([
-                    '-refs', '2',  # Fewer reference frames for speed
-                    '-bf', '2',  # B-frames for compression
-                ])
+            if codec in HW_ENCODERS:
+                cmd.extend(self._hw_encode_args(codec, bitrate, maxrate, bufsize, gop_size))
             else:
+                # zerolatency: tanpa lookahead/frame-threading buffer, lebih ringan per frame
+                tune = video.get('tune', 'zerolatency') or ''  # null = disabled too
+                
                 cmd.extend([
-                    '-refs', '3',  # More reference frames for quality
-                    '-bf', '3',  # More B-frames for better compression
+                    '-preset', video['preset'],
+                    '-b:v', bitrate,
+                    '-maxrate', maxrate,
+                    '-bufsize', bufsize,
+                    '-s', video['resolution'],
+                    '-r', '30',  # 30 fps
+                    '-g', str(gop_size),  # Keyframe interval
+                    '-keyint_min', str(gop_size),  # Minimum keyframe interval
+                    '-sc_threshold', '0',  # Disable scene change detection
+                    '-pix_fmt', 'yuv420p',
+                    '-profile:v', 'high',  # H.264 High profile
+                    '-level', '4.2',  # Level for 2K
                 ])
+                
+                # Add tune unless disabled with "tune": "" or null (film, animation, etc)
+                if tune:
+                    cmd.extend(['-tune', tune])
+                
+                # Additional quality settings for veryfast/faster presets.
+                # zerolatency turns B-frames off; -bf (applied after the tune) would bring them back
+                zerolatency = 'zerolatency' in tune
+                if video['preset'] in ['veryfast', 'faster', 'fast']:
+                    cmd.extend(['-refs', '2'])  # Fewer reference frames for speed
+                    if not zerolatency:
+                        cmd.extend(['-bf', '2'])  # B-frames for compression
+                else:
+                    cmd.extend(['-refs', '3'])  # More reference frames for quality
+                    if not zerolatency:
+                        cmd.extend(['-bf', '3'])  # More B-frames for better compression
         
         # Add buffer size for copy codec too
-        if self.config['video']['codec'] == 'copy':
+        if codec == 'copy':
             cmd.extend([
-                '-bufsize', self.config['streaming']['buffer_size'],
+                '-bufsize', streaming['buffer_size'],
             ])
         
-        # Audio encoding with smooth loop (fade in/out for seamless transition)
-        # Audio encoding with infinite looping + crossfade overlap (8 detik) - metode proven dari test
-        if audio_duration and audio_duration > crossfade_duration * 2:
-            # Calculate fade start point dan delay
-            fade_start = audio_duration - crossfade_duration
-            delay_ms = int(fade_start * 1000)
-            
-            # Filter: sama seperti test_crossfade.py yang sudah proven work
-            # Audio 1 fade out, Audio 2 delayed + fade in, lalu mix
-            audio_filter = (
-                f"[1:a]afade=t=out:st={fade_start}:d={crossfade_duration}:curve=qsin[a1];"
-                f"[2:a]adelay={delay_ms}|{delay_ms},afade=t=in:st=0:d={crossfade_duration}:curve=qsin[a2];"
-                f"[a1][a2]amix=inputs=2:duration=first:dropout_transition=0[aout]"
-            )
-            
-            cmd.extend([
-                '-filter_complex', audio_filter,
-                '-map', '[aout]',
-                '-c:a', self.config['audio']['codec'],
-                '-b:a', self.config['audio']['bitrate'],
-                '-ar', '48000',
-            ])
-            print(f"✅ Infinite loop dengan smooth crossfade: fade in {crossfade_duration}s di awal, fade out {crossfade_duration}s di akhir setiap loop")
-        else:
-            # Audio terlalu pendek, skip crossfade
-            cmd.extend([
-                '-map', '1:a:0',
-                '-c:a', self.config['audio']['codec'],
-                '-b:a', self.config['audio']['bitrate'],
-                '-ar', '48000',
-            ])
-            if audio_duration:
-                print(f"⚠️  Audio too short ({audio_duration}s) for {crossfade_duration}s crossfade")
+        # Audio encoding
+        cmd.extend([
+            '-map', '1:a:0',
+            '-c:a', audio['codec'],
+            '-b:a', audio['bitrate'],
+            '-ar', '48000',
+        ])
         cmd.extend([
             # Streaming settings with buffering
             '-f', 'flv',
@@ -245,106 +703,348 @@ class ASMRStreamer:
             '-max_muxing_queue_size', '9999',  # Large muxing queue
             '-fflags', '+genpts',  # Generate presentation timestamps
             
-            youtube_url
+            # Machine-readable progress (key=value) on stdout, no \r stats on stderr
+            '-progress', 'pipe:1',
+            '-nostats',
+            
+            self._youtube_url
         ])
         
         return cmd
     
-    def _read_ffmpeg_output(self):
-        """Read FFmpeg stderr output in real-time to prevent buffer blocking."""
-        if not self.process or not self.process.stderr:
+    def _hw_encode_args(self, codec, bitrate, maxrate, bufsize, gop_size):
+        """Encoder options for a hardware H.264 encoder (x264-only flags like -tune/-refs left out)."""
+        resolution = self.config['video']['resolution']
+        args = [
+            '-b:v', bitrate,
+            '-maxrate', maxrate,
+            '-bufsize', bufsize,
+            '-r', '30',
+            '-g', str(gop_size),
+            '-profile:v', 'high',
+        ]
+        if codec == 'h264_vaapi':
+            # Scale on the CPU, then upload frames to the GPU encoder
+            return args + ['-vf', f"scale={resolution.replace('x', ':')},format=nv12,hwupload", '-rc_mode', 'VBR']
+        
+        args += ['-s', resolution, '-pix_fmt', 'nv12' if codec == 'h264_qsv' else 'yuv420p']
+        if codec == 'h264_nvenc':
+            args += ['-preset', 'p4', '-tune', 'll', '-rc', 'vbr']  # p4 = balanced, low-latency tuning
+        elif codec == 'h264_videotoolbox':
+            args += ['-realtime', '1']
+        return args
+    
+    def build_mux_command(self, fifo_path):
+        """Build the copy-only FFmpeg that reads the encoder's FLV from a FIFO and sends it to YouTube."""
+        return [
+            'ffmpeg',
+            '-nostats',
+            # Demuxer thread keeps draining the FIFO while the RTMP write blocks
+            '-thread_queue_size', str(MUX_THREAD_QUEUE_SIZE),
+            '-f', 'flv',
+            '-i', fifo_path,
+            '-c', 'copy',
+            '-f', 'flv',
+            '-flvflags', 'no_duration_filesize',
+            self._youtube_url
+        ]
+    
+    def _tail_ffmpeg_log(self, offset, exited_event):
+        """Scan new FFmpeg log lines every couple of seconds until FFmpeg exits."""
+        pending = b''
+        with open(self._ffmpeg_log_path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                exited = exited_event.wait(FFMPEG_LOG_POLL_SECONDS)
+                *lines, pending = _LINE_SPLIT_RE.split(pending + f.read())
+                for line in lines:
+                    self._handle_ffmpeg_line(line.strip())
+                if exited:
+                    break
+        if pending.strip():
+            self._handle_ffmpeg_line(pending.strip())
+    
+    def _handle_ffmpeg_line(self, line):
+        """Record one raw FFmpeg stderr line, keeping important ones in the log ring."""
+        if not line:
             return
+        self._stderr_tail.append(line)
         
-        for line in iter(self.process.stderr.readline, ''):
-            if not line:
-                break
-            line = line.strip()
+        # Important messages: ring buffer, lihat dengan `kill -USR1 <pid>`
+        if _IMPORTANT_RE.search(line):
+            self._log_ring.append((time.time(), line))
+    
+    def _dump_log_ring(self, signum=None, frame=None):
+        """SIGUSR1 handler: write all buffered important FFmpeg lines in one go."""
+        body = "".join(
+            f"[FFmpeg {datetime.fromtimestamp(t).strftime('%H:%M:%S')}] {line.decode('utf-8', 'replace')}\n"
+            for t, line in list(self._log_ring)
+        )
+        sys.stdout.write(f"\n--- FFmpeg messages ({len(self._log_ring)}) ---\n{body}---\n")
+        sys.stdout.flush()
+    
+    def _read_ffmpeg_progress(self, process, ready_event, exited_event):
+        """Parse FFmpeg -progress key=value blocks from stdout into self.stats.
+        
+        Gets its own Popen and events: self.process/self._*_event belong to the
+        next session once this one has exited.
+        """
+        block = {}
+        for line in _iter_lines(process.stdout):
+            key, sep, value = line.partition(b'=')
+            if not sep:
+                continue
+            key = key.strip().decode('ascii', 'replace')
+            value = value.strip().decode('ascii', 'replace')
+            if key != 'progress':
+                block[key] = value
+                continue
+            
+            # "progress=continue|end" closes one block
+            self._update_stats(block, ready_event)
+            block = {}
+        
+        # EOF: FFmpeg exited, reap it and wake up anyone waiting for startup
+        process.wait()
+        exited_event.set()
+        ready_event.set()
+    
+    def _update_stats(self, block, ready_event):
+        """Publish one progress block and warn on dropped frames / slow encoding."""
+        def number(key, cast=float):
+            try:
+                return cast(block.get(key, '').rstrip('x'))
+            except ValueError:
+                return cast(0)  # "N/A" before the first frame
+        
+        stats = {
+            'frame': number('frame', int),
+            'fps': number('fps'),
+            'bitrate': block.get('bitrate', 'N/A'),
+            'drop_frames': number('drop_frames', int),
+            'dup_frames': number('dup_frames', int),
+            'speed': number('speed'),
+        }
+        stats['current_speed'] = self._current_speed(time.monotonic(), number('out_time_us', int))
+        previous = self.stats
+        self.stats = stats
+        
+        # Signal that FFmpeg is actually encoding/sending
+        if stats['frame'] > 0 and not ready_event.is_set():
+            self._got_frames = True
+            ready_event.set()
+        
+        if stats['drop_frames'] > previous.get('drop_frames', 0):
+            print(f"[ALERT] FFmpeg dropped {stats['drop_frames'] - previous.get('drop_frames', 0)} frame(s) (total {stats['drop_frames']})")
+        # Warn once when encoding falls behind real time (upload/CPU can't keep up)
+        current = stats['current_speed']
+        slow = current is not None and current < SLOW_SPEED
+        if slow and not previous.get('slow'):
+            print(f"[ALERT] FFmpeg speed {current:.2f}x < 1x (last {SPEED_WINDOW_SECONDS}s) - encoder/upload can't keep up")
+        stats['slow'] = slow
+        
+        if self._adaptive and current is not None:
+            self._adapt_bitrate(current)
+        
+        # Show progress/stats every few seconds
+        if hasattr(self, '_last_progress_time'):
+            if time.time() - self._last_progress_time < 5:
+                return
+        self._last_progress_time = time.time()
+        print(f"[Progress] frame={stats['frame']} fps={stats['fps']:.1f} bitrate={stats['bitrate']} "
+              f"speed={stats['speed']:.2f}x drop={stats['drop_frames']} dup={stats['dup_frames']}")
+    
+    def _current_speed(self, now, out_time_us):
+        """Encoding speed over the last few seconds, or None during warm-up / before enough samples."""
+        if out_time_us <= 0 or now - self._session_started < SPEED_WARMUP_SECONDS:
+            return None  # Startup burst / connect stall would skew the window
+        samples = self._speed_samples
+        samples.append((now, out_time_us))
+        while now - samples[0][0] > SPEED_WINDOW_SECONDS:
+            samples.popleft()
+        start, start_us = samples[0]
+        if now - start < SPEED_WINDOW_SECONDS / 2:
+            return None
+        return (out_time_us - start_us) / ((now - start) * 1e6)
+    
+    def _adapt_bitrate(self, speed):
+        """Feed one current-speed sample; restart FFmpeg at a new bitrate on sustained slow/fast encoding."""
+        if self._pending_scale is not None:
+            return
+        now = time.monotonic()
+        
+        if speed < SLOW_SPEED:
+            self._fast_since = None
+            if self._slow_since is None:
+                self._slow_since = now
+            elif now - self._slow_since >= ADAPTIVE_SLOW_AFTER and self._bitrate_scale > ADAPTIVE_MIN_SCALE:
+                self._request_bitrate(max(ADAPTIVE_MIN_SCALE, self._bitrate_scale * ADAPTIVE_STEP_DOWN),
+                                      f"speed < {SLOW_SPEED}x for {ADAPTIVE_SLOW_AFTER}s")
+            return
+        
+        self._slow_since = None
+        if speed < ADAPTIVE_RECOVER_SPEED or self._bitrate_scale >= 1.0:
+            self._fast_since = None
+            return
+        if self._fast_since is None:
+            self._fast_since = now
+        elif now - self._fast_since >= ADAPTIVE_RAISE_AFTER:
+            self._request_bitrate(min(1.0, self._bitrate_scale * ADAPTIVE_STEP_UP),
+                                  f"speed >= {ADAPTIVE_RECOVER_SPEED}x for {ADAPTIVE_RAISE_AFTER}s")
+    
+    def _request_bitrate(self, scale, reason):
+        """Stop FFmpeg gracefully so run_with_auto_restart relaunches it at bitrate * scale."""
+        print(f"[ADAPTIVE] {reason}: video bitrate {self._bitrate_scale:.0%} -> {scale:.0%} of config, restarting FFmpeg")
+        self._pending_scale = scale
+        self.process.terminate()
+    
+    def _apply_pending_bitrate(self):
+        """Switch to the pending bitrate scale, if any. Returns True if there was one."""
+        if self._pending_scale is None:
+            return False
+        self._bitrate_scale = self._pending_scale
+        self._pending_scale = None
+        return True
+    
+    def _ffmpeg_command(self, output=None):
+        """Fill the precomputed argv template with the output and the current video bitrate."""
+        cmd = list(self._ffmpeg_argv_template)
+        if output:
+            cmd[self._output_index] = output
+        if self._bitrate_scale != 1.0:
+            for index, mbps in self._rate_slots:
+                cmd[index] = f"{mbps * self._bitrate_scale:.3g}M"
+        return cmd
+    
+    def _monitor_loop(self, stop):
+        """Log and display stats every log interval until stop is set."""
+        # Console display only when the monitor isn't already printing stats
+        # (both would share psutil's non-blocking CPU counter)
+        show_status = PSUTIL_AVAILABLE and not self.monitor.enabled
+        if show_status:
+            psutil.cpu_percent(interval=None)  # Prime the non-blocking counter
+        
+        while not stop.wait(self.monitor.log_interval):
+            self.monitor.log_stats(self.process.pid, self.stats)
             
-            # Show important messages
-            if any(keyword in line.lower() for keyword in ['error', 'warning', 'failed', 'invalid']):
-                print(f"[FFmpeg] {line}")
-            # Show progress/stats every few seconds
-            elif 'frame=' in line or 'speed=' in line:
-                # Only show occasional progress updates
-                if hasattr(self, '_last_progress_time'):
-                    if time.time() - self._last_progress_time < 5:
-                        continue
-                self._last_progress_time = time.time()
-                print(f"[Progress] {line}")
+            if show_status:
+                cpu_percent = psutil.cpu_percent(interval=None)
+                memory = psutil.virtual_memory()
+                cpu_status = "✅" if cpu_percent < 70 else "⚠️" if cpu_percent < 90 else "🔥"
+                ram_status = "✅" if memory.percent < 70 else "⚠️" if memory.percent < 90 else "🔥"
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {cpu_status} CPU: {cpu_percent:.1f}% | {ram_status} RAM: {memory.percent:.1f}% ({memory.used / 1024**3:.1f}GB/{memory.total / 1024**3:.1f}GB)")
     
     def start_stream(self):
-        """Start the streaming process."""
-        print("=" * 60)
-        print("Starting ASMR YouTube Stream...")
-        print("=" * 60)
-        print(f"Video: {self.config['video']['file']}")
-        print(f"Audio: {self.config['audio']['file']}")
-        print(f"Resolution: {self.config['video']['resolution']}")
-        print(f"Video Bitrate: {self.config['video']['bitrate']}")
-        print(f"Audio Bitrate: {self.config['audio']['bitrate']}")
-        print(f"Buffer: {self.config['streaming']['buffer_size']}")
-        print("=" * 60)
-        print("\nPress Ctrl+C to stop streaming\n")
-        
-        cmd = self.build_ffmpeg_command()
+        """Start the streaming process. Returns FFmpeg's exit code (None if stopped by user)."""
+        rule = "=" * 60 + "\n" if _IS_TTY else ""
+        bitrate, maxrate, bufsize = _video_rates(self.config['video'], self.config['streaming'])
+        sys.stdout.write(
+            f"{rule}"
+            "Starting ASMR YouTube Stream...\n"
+            f"{rule}"
+            f"Video: {self.config['video']['file']}\n"
+            f"Audio: {self.config['audio']['file']}\n"
+            f"Resolution: {self.config['video']['resolution']}\n"
+            f"Video Bitrate: {bitrate} (max {maxrate})"
+            f"{f' (adaptive: {self._bitrate_scale:.0%})' if self._bitrate_scale != 1.0 else ''}\n"
+            f"Audio Bitrate: {self.config['audio']['bitrate']}\n"
+            f"Buffer: {bufsize}\n"
+            f"{rule}"
+            "\nPress Ctrl+C to stop streaming\n\n"
+        )
+        sys.stdout.flush()
+        
+        cmd = self._ffmpeg_command()
+        fifo_dir = None
         
         try:
-            # Start FFmpeg process
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1  # Line buffered
-            )
+            self._ensure_stream_inputs()
+            
+            # Start FFmpeg process. stderr goes straight to a log file (kernel
+            # does the copying); Python only scans it every few seconds.
+            _rotate_log(self._ffmpeg_log_path, FFMPEG_LOG_MAX_BYTES)
+            with open(self._ffmpeg_log_path, 'ab', buffering=0) as ffmpeg_log:
+                log_offset = os.fstat(ffmpeg_log.fileno()).st_size
+                
+                # split_mux: encoder tulis FLV ke FIFO, FFmpeg kedua (copy saja) yang
+                # kirim ke RTMP, jadi upload yang tersendat tidak langsung menahan encoder
+                if self._split_mux:
+                    fifo_dir = tempfile.mkdtemp(prefix='asmr_mux_')
+                    fifo_path = os.path.join(fifo_dir, 'stream.flv')
+                    os.mkfifo(fifo_path)
+                    cmd = self._ffmpeg_command(fifo_path)
+                    cmd.insert(1, '-y')  # FIFO already exists
+                    self.mux_process = subprocess.Popen(
+                        self.build_mux_command(fifo_path),
+                        stdout=subprocess.DEVNULL,
+                        stderr=ffmpeg_log,
+                        close_fds=True,
+                    )
+                    print(f"FFmpeg RTMP muxer started (PID: {self.mux_process.pid})")
+                
+                self.process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,  # -progress key=value stream
+                    stderr=ffmpeg_log,
+                    bufsize=0,  # Raw bytes, decoded only when printed
+                    # Tanpa preexec_fn/user/group: CPython pakai vfork() di Linux,
+                    # jadi page table proses ini tidak di-copy saat spawn
+                    close_fds=True,
+                )
             
             print(f"FFmpeg process started (PID: {self.process.pid})")
+            self.monitor.track_process(self.process.pid)
             print("Menyiapkan streaming...")
             print("Menunggu koneksi ke YouTube RTMP...\n")
             
             # Start thread to read FFmpeg output
-            output_thread = threading.Thread(target=self._read_ffmpeg_output, daemon=True)
+            self._stderr_tail.clear()
+            # Fresh events per session so a late thread of the previous one can't set them
+            self._ready_event = threading.Event()
+            self._exited_event = threading.Event()
+            self.stats = {}
+            self._got_frames = False
+            self._slow_since = None
+            self._fast_since = None
+            self._speed_samples.clear()
+            self._session_started = time.monotonic()
+            output_thread = threading.Thread(target=self._tail_ffmpeg_log,
+                                             args=(log_offset, self._exited_event), daemon=True)
             output_thread.start()
+            threading.Thread(target=self._read_ffmpeg_progress,
+                             args=(self.process, self._ready_event, self._exited_event), daemon=True).start()
             
-            # Wait a bit for initial connection
-            time.sleep(3)
+            # Wait until FFmpeg reports the first encoded frame (or exits)
+            prebuffer_timeout = self.config['streaming'].get('prebuffer_timeout', 35)
+            self._ready_event.wait(timeout=prebuffer_timeout)
             
             # Check if still running after initial connection
             if self.process.poll() is not None:
                 print("\n❌ FFmpeg process terminated during startup!")
-                stderr = self.process.stderr.read()
-                if stderr:
-                    print(f"Error output:\n{stderr}")
-                return
+                output_thread.join(timeout=2)
+                if self._stderr_tail:
+                    stderr_tail = b'\n'.join(self._stderr_tail).decode('utf-8', 'replace')
+                    print(f"Error output:\n{stderr_tail}")
+                return self.process.returncode
             
             print("✅ Streaming dimulai! Data sedang dikirim ke YouTube...\n")
             
-            # Monitor the stream
-            loop_count = 0
-            while True:
-                # Check if process is still running
-                if self.process.poll() is not None:
-                    print("\n❌ FFmpeg process terminated unexpectedly!")
-                    break
-                
-                # Log stats
-                self.monitor.log_stats(self.process.pid)
-                
-                # Display stats every 5 seconds
-                loop_count += 1
-                if loop_count % 5 == 0:
-                    try:
-                        import psutil
-                        cpu_percent = psutil.cpu_percent(interval=0.5)
-                        memory = psutil.virtual_memory()
-                        cpu_status = "✅" if cpu_percent < 70 else "⚠️" if cpu_percent < 90 else "🔥"
-                        ram_status = "✅" if memory.percent < 70 else "⚠️" if memory.percent < 90 else "🔥"
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] {cpu_status} CPU: {cpu_percent:.1f}% | {ram_status} RAM: {memory.percent:.1f}% ({memory.used / 1024**3:.1f}GB/{memory.total / 1024**3:.1f}GB)")
-                    except ImportError:
-                        pass  # psutil not installed, skip monitoring display
-                
-                # Sleep to avoid busy waiting
-                time.sleep(1)
+            # Monitor the stream from a background thread; main thread just
+            # blocks until FFmpeg exits (no 1 Hz polling)
+            stop = threading.Event()
+            monitor_thread = threading.Thread(target=self._monitor_loop, args=(stop,), daemon=True)
+            monitor_thread.start()
+            try:
+                self.process.wait()
+            finally:
+                stop.set()
+            output_thread.join(timeout=2)  # Let the log scan print FFmpeg's last lines
+            if self._pending_scale is None:
+                print(f"\n❌ FFmpeg process terminated unexpectedly! (exit code {self.process.returncode})")
+                last_lines = list(self._stderr_tail)[-10:]  # The reason is usually in here
+                if last_lines:
+                    print(b'\n'.join(last_lines).decode('utf-8', 'replace'))
+            return self.process.returncode
         
         except KeyboardInterrupt:
             print("\n\nStopping stream...")
@@ -355,6 +1055,26 @@ class ASMRStreamer:
             print(f"\nError during streaming: {e}")
             self.stop_stream()
             raise
+        
+        finally:
+            if fifo_dir:
+                self._stop_muxer()
+                shutil.rmtree(fifo_dir, ignore_errors=True)  # Don't mask an earlier error
+    
+    def _stop_muxer(self):
+        """Wait briefly for the RTMP muxer to drain after the encoder closed the FIFO, then stop it."""
+        if not self.mux_process:
+            return
+        try:
+            self.mux_process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.mux_process.terminate()
+            try:
+                self.mux_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.mux_process.kill()
+                self.mux_process.wait()
+        self.mux_process = None
     
     def stop_stream(self):
         """Stop the streaming process gracefully."""
@@ -368,18 +1088,42 @@ class ASMRStreamer:
                 self.process.kill()
                 self.process.wait()
     
+    def should_restart(self, returncode):
+        """Respawn after any FFmpeg crash except a clean exit or a config/input error that sticks."""
+        if returncode is None or returncode in _CLEAN_EXIT_CODES:
+            return False
+        fatal = None
+        for line in list(self._stderr_tail)[-50:]:
+            m = _FATAL_RE.search(line)
+            if m:
+                fatal = m.group(0).lower()
+        previous, self._last_fatal = self._last_fatal, fatal
+        if fatal is None:
+            return True
+        # Never got a frame out (bad config/input), or the same error twice in a row
+        return self._got_frames and fatal != previous
+    
     def run_with_auto_restart(self, max_attempts=None):
         """Run streaming with automatic restart on failure."""
         max_attempts = max_attempts or self.config['streaming'].get('max_reconnect_attempts', 10)
         delay = self.config['streaming'].get('reconnect_delay_seconds', 5)
+        # Copy codec has no bitrate to adapt
+        self._adaptive = self.config['streaming'].get('adaptive_bitrate', False) and bool(self._rate_slots)
         
         attempt = 0
         while max_attempts == -1 or attempt < max_attempts:
             try:
                 attempt += 1
                 print(f"\n[Attempt {attempt}] Starting stream...")
-                self.start_stream()
-                break  # Successful completion (user stopped)
+                returncode = self.start_stream()
+                if self._apply_pending_bitrate():
+                    attempt -= 1  # Planned bitrate switch, not a failure: no delay
+                    continue
+                if not self.should_restart(returncode):
+                    if returncode not in (None, *_CLEAN_EXIT_CODES):
+                        print("FFmpeg exited with a config/input error, not restarting. Check the output above.")
+                    break  # Clean exit, user stopped, or non-recoverable error
+                print(f"\n[Attempt {attempt}] Stream dropped (FFmpeg exited with code {returncode})")
             
             except KeyboardInterrupt:
                 print("\nUser stopped the stream.")
@@ -387,40 +1131,39 @@ class ASMRStreamer:
             
             except Exception as e:
                 print(f"\n[Attempt {attempt}] Stream failed: {e}")
-                if max_attempts == -1 or attempt < max_attempts:
-                    print(f"Restarting in {delay} seconds...")
-                    time.sleep(delay)
-                else:
-                    print(f"Max reconnection attempts ({max_attempts}) reached. Exiting.")
-                    break
+            
+            if max_attempts == -1 or attempt < max_attempts:
+                print(f"Restarting in {delay} seconds...")
+                time.sleep(delay)
+            else:
+                print(f"Max reconnection attempts ({max_attempts}) reached. Exiting.")
+                break
 
 
-def main():
-    """Main entry point."""
-    print("""
-    ╔════════════════════════════════════════════════════════╗
-    ║   Lightweight YouTube ASMR Streaming Application       ║
-    ║   Optimized for minimal CPU/RAM usage                  ║
-    ╚════════════════════════════════════════════════════════╝
-    """)
+def main(auto_restart=None):
+    """Main entry point. auto_restart=None asks the user interactively."""
+    if _IS_TTY:
+        sys.stdout.write(_BANNER)
+        sys.stdout.flush()
     
-    # Check if config file exists
+    # Initialize and start streamer (exits with a hint if config is missing)
     config_file = 'config.json'
-    if not os.path.exists(config_file):
-        print(f"Config file not found. Please create '{config_file}'")
-        print(f"You can copy 'config.example.json' as a template.\n")
+    try:
+        streamer = ASMRStreamer(config_file)
+    except ConfigError as e:
+        for message, hint in e.problems:
+            print(f"Error: {message}")
+            print(hint)
         sys.exit(1)
     
-    # Initialize and start streamer
-    streamer = ASMRStreamer(config_file)
-    
     # Ask user about auto-restart
-    print("\nOptions:")
-    print("1. Stream once (manual restart if disconnected)")
-    print("2. Auto-restart on disconnection (recommended for 24/7)")
-    choice = input("\nSelect option (1 or 2): ").strip()
+    if auto_restart is None:
+        print("\nOptions:")
+        print("1. Stream once (manual restart if disconnected)")
+        print("2. Auto-restart on disconnection (recommended for 24/7)")
+        auto_restart = input("\nSelect option (1 or 2): ").strip() == '2'
     
-    if choice == '2':
+    if auto_restart:
         print("\nStarting with auto-restart enabled...")
         streamer.run_with_auto_restart(max_attempts=-1)  # Infinite retries
     else:
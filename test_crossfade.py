@@ -5,6 +5,9 @@ Test crossfade audio - output ke WAV untuk preview sebelum streaming
 
 import subprocess
 import json
+import os
+
+from stream import CROSSFADE_SECONDS, audio_duration, _render_crossfade_loop
 
 # Load config
 with open('config.json', 'r') as f:
@@ -12,42 +15,35 @@ with open('config.json', 'r') as f:
 
 audio_file = config['audio']['file']
 
-# Get audio duration
-result = subprocess.run([
-    'ffprobe',
-    '-v', 'error',
-    '-show_entries', 'format=duration',
-    '-of', 'default=noprint_wrappers=1:nokey=1',
-    audio_file
-], capture_output=True, text=True)
+# Get audio duration (sidecar cache yang sama dengan stream.py, tanpa ffprobe kalau sudah ada)
+duration, _ = audio_duration(audio_file)
+if duration is None:
+    print("❌ Error! Could not detect audio duration")
+    raise SystemExit(1)
 
-duration = float(result.stdout.strip())
-crossfade_duration = 8  # 8 seconds
+crossfade_duration = CROSSFADE_SECONDS
 
 print(f"Audio duration: {duration:.2f} seconds")
 print(f"Crossfade: {crossfade_duration} seconds")
+
+# Sama dengan stream.py: crossfade butuh audio lebih dari 2x durasi crossfade
+if duration <= crossfade_duration * 2:
+    print(f"⚠️  Audio too short ({duration}s) for {crossfade_duration}s crossfade")
+    raise SystemExit(1)
+
 print(f"Creating 4x loop with crossfade overlap...\n")
 
-# Calculate parameters
-fade_start = duration - crossfade_duration
-delay_ms = int(fade_start * 1000)
+# Render loop yang sama dengan yang dipakai stream.py (acrossfade, sekali saja)
+loop_file = _render_crossfade_loop(audio_file, os.stat(audio_file), crossfade_duration)
+if not loop_file:
+    print("❌ Error! Gagal render crossfade loop")
+    raise SystemExit(1)
 
-# FFmpeg command: 4 loops dengan crossfade
+# FFmpeg command: 4 loops dari loop file (sambungan loop sudah crossfade)
 cmd = [
     'ffmpeg', '-y',
-    # Load audio 2x
     '-stream_loop', '3',  # 4x loop = 3+1
-    '-i', audio_file,
-    '-stream_loop', '3',
-    '-i', audio_file,
-    
-    # Filter: audio 1 fade out di akhir, audio 2 delayed + fade in, mix (quarter sine tanpa volume boost)
-    '-filter_complex',
-    f'[0:a]afade=t=out:st={fade_start}:d={crossfade_duration}:curve=qsin[a1];'
-    f'[1:a]adelay={delay_ms}|{delay_ms},afade=t=in:st=0:d={crossfade_duration}:curve=qsin[a2];'
-    f'[a1][a2]amix=inputs=2:duration=first:dropout_transition=0[aout]',
-    
-    '-map', '[aout]',
+    '-i', loop_file,
     '-c:a', 'pcm_s16le',
     '-ar', '48000',
     'test_crossfade_4x.wav'
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Single entry point untuk semua tools: stream, debug, bandwidth
+
+    python -m ytube_stream debug --stream   # diagnose, lalu langsung stream
+
+Submodule di-import di dalam handler, jadi cuma code path yang dipakai yang
+di-load. Semua command berbagi satu _load_config() (config.json di-parse sekali).
+"""
+
+import argparse
+import sys
+
+
+def _stream_mode(args):
+    """Map --once/--auto-restart to stream.main()'s auto_restart argument."""
+    if args.auto_restart:
+        return True
+    if args.once:
+        return False
+    return None  # Tanya user
+
+
+def cmd_stream(args):
+    """Start streaming to YouTube."""
+    import stream
+    stream.main(auto_restart=_stream_mode(args))
+
+
+def cmd_debug(args):
+    """Run the streaming quality debugger, optionally followed by the stream."""
+    import debug_stream
+    debug_stream.main(ffmpeg_pid=args.pid)
+    
+    if args.stream:
+        import stream
+        stream.main(auto_restart=_stream_mode(args))
+
+
+def cmd_bandwidth(args):
+    """Run the quick bandwidth test."""
+    import bandwidth_test
+    bandwidth_test.test_upload_to_youtube()
+
+
+def _add_stream_options(parser):
+    """Options shared by every subcommand that may start the stream."""
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--once', action='store_true',
+                      help='stream once (manual restart if disconnected)')
+    mode.add_argument('--auto-restart', action='store_true',
+                      help='auto-restart on disconnection (recommended for 24/7)')
+
+
+def main(argv=None):
+    """Parse arguments and dispatch to the selected subcommand."""
+    parser = argparse.ArgumentParser(
+        prog='ytube_stream',
+        description='Lightweight YouTube ASMR streaming tools'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    p_stream = subparsers.add_parser('stream', help='start streaming to YouTube')
+    _add_stream_options(p_stream)
+    p_stream.set_defaults(func=cmd_stream)
+    
+    p_debug = subparsers.add_parser('debug', help='diagnose network and encoding issues')
+    p_debug.add_argument('--pid', type=int,
+                         help='PID of the running FFmpeg (skips the process scan)')
+    p_debug.add_argument('--stream', action='store_true',
+                         help='start streaming after the checks (same process, same config)')
+    _add_stream_options(p_debug)
+    p_debug.set_defaults(func=cmd_debug)
+    
+    p_bandwidth = subparsers.add_parser('bandwidth', help='quick upload bandwidth test')
+    p_bandwidth.set_defaults(func=cmd_bandwidth)
+    
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())